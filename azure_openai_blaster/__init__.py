@@ -3,7 +3,11 @@
 from azure_openai_blaster.azure_deployment import AzureDeploymentConfig
 from azure_openai_blaster.azure_endpoint_state import AzureEndpointState
 from azure_openai_blaster.blaster import AzureLLMBlaster
-from azure_openai_blaster.initialization import build_endpoint_states
+from azure_openai_blaster.event_loop import run_async
+from azure_openai_blaster.initialization import (
+    build_endpoint_states,
+    release_endpoint_states,
+)
 from azure_openai_blaster.scheduler.weighted import WeightedRRScheduler
 
 __all__ = [
@@ -12,4 +16,6 @@ __all__ = [
     "AzureEndpointState",
     "WeightedRRScheduler",
     "build_endpoint_states",
+    "release_endpoint_states",
+    "run_async",
 ]
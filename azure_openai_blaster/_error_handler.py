@@ -1,9 +1,12 @@
 import logging
 import re
+from functools import lru_cache
 from typing import Optional
 
 from openai import RateLimitError
 
+logger = logging.getLogger(__name__)
+
 _RE_TRY_AGAIN_IN = re.compile(r"try again in (\d+)\s*seconds", re.IGNORECASE)
 
 
@@ -13,30 +16,32 @@ def parse_retry_after_seconds(exc: RateLimitError) -> Optional[float]:
     We prefer headers, but will fall back to parsing the message string
     `"Rate limit is exceeded. Try again in 60 seconds."`.
     """
-    # 1) Try HTTP header if present
-    try:
-        headers = getattr(exc, "response", None)
-        if headers is not None:
-            retry_after = exc.response.headers.get("retry-after")
-            logging.info(
-                f"Parsed Retry-After header: {retry_after} -> {float(retry_after)}"
-            )
-            if retry_after is not None:
-                try:
-                    return float(retry_after)
-                except ValueError:
-                    pass
-    except Exception:
-        pass
+    # 1) Try HTTP header if present; return immediately when it parses.
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None:
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                pass
+            else:
+                logger.info("Parsed Retry-After header: %s", retry_after)
+                return seconds
 
     # 2) Fallback: parse message text
-    msg = str(exc)
+    seconds = _parse_retry_after_message(str(exc))
+    if seconds is not None:
+        logger.info("Parsed Retry-After message: %s seconds", seconds)
+    return seconds
+
+
+@lru_cache(maxsize=256)
+def _parse_retry_after_message(msg: str) -> Optional[float]:
+    """Parse "try again in N seconds" out of an error message.
+
+    Azure sends a handful of canonical messages, so results are memoized
+    (bounded) to skip the regex under sustained throttling.
+    """
     m = _RE_TRY_AGAIN_IN.search(msg)
-    if m:
-        try:
-            logging.info(f"Parsed Retry-After message: {m.group(1)} seconds")
-            return float(m.group(1))
-        except ValueError:
-            return None
-
-    return None
+    return float(m.group(1)) if m else None
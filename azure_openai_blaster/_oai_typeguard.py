@@ -1,7 +1,53 @@
-from typing import Any, TypeGuard
+from typing import Any, Callable, TypeGuard
 
 from openai.types.chat import ChatCompletionMessageParam
 
+_ALLOWED_SIMPLE = frozenset({"role", "content", "name"})
+_ALLOWED_ASSISTANT = frozenset(
+    {
+        "role",
+        "audio",
+        "content",
+        "function_call",
+        "name",
+        "refusal",
+        "tool_calls",
+    }
+)
+
+
+def _is_simple_message(obj: dict) -> bool:
+    """user / system / developer / function: `content` plus optional `name`."""
+    return "content" in obj and obj.keys() <= _ALLOWED_SIMPLE
+
+
+def _is_assistant_message(obj: dict) -> bool:
+    if not obj.keys() <= _ALLOWED_ASSISTANT:
+        return False
+    # content is required unless tool_calls or function_call is present
+    return (
+        obj.get("content") is not None or "tool_calls" in obj or "function_call" in obj
+    )
+
+
+def _is_tool_message(obj: dict) -> bool:
+    return "content" in obj and "tool_call_id" in obj
+
+
+def _reject(obj: dict) -> bool:
+    return False
+
+
+_VALIDATORS: dict[str, Callable[[dict], bool]] = {
+    "user": _is_simple_message,
+    "system": _is_simple_message,
+    "developer": _is_simple_message,
+    "function": _is_simple_message,
+    "assistant": _is_assistant_message,
+    "tool": _is_tool_message,
+}
+"""Role-discriminated validators for chat messages."""
+
 
 def is_chat_message(obj: Any) -> TypeGuard[ChatCompletionMessageParam]:
     """Type guard to validate an arbitrary dict is a ChatCompletionMessageParam."""
@@ -12,37 +58,7 @@ def is_chat_message(obj: Any) -> TypeGuard[ChatCompletionMessageParam]:
     if not isinstance(role, str):
         return False
 
-    # role-discriminated checks
-    if role in ["user", "system", "developer", "function"]:
-        allowed_keys = {"role", "content", "name"}
-        if not set(obj.keys()).issubset(allowed_keys):
-            return False
-        return "content" in obj
-
-    elif role == "assistant":
-        allowed_keys = {
-            "role",
-            "audio",
-            "content",
-            "function_call",
-            "name",
-            "refusal",
-            "tool_calls",
-        }
-        if not set(obj.keys()).issubset(allowed_keys):
-            return False
-
-        has_content = ("content" in obj) and (obj.get("content") is not None)
-        has_tool_calls = "tool_calls" in obj
-        has_function_call = "function_call" in obj
-
-        # content is required unless tool_calls or function_call is present
-        return has_content or has_tool_calls or has_function_call
-
-    elif role == "tool":
-        return "content" in obj and "tool_call_id" in obj
-
-    return False
+    return _VALIDATORS.get(role, _reject)(obj)
 
 
 def is_chat_message_list(
@@ -50,4 +66,5 @@ def is_chat_message_list(
 ) -> TypeGuard[list[ChatCompletionMessageParam]]:
     if not isinstance(obj, list):
         return False
-    return all(is_chat_message(m) for m in obj)
+    # map() keeps the iteration in C rather than a generator frame per item.
+    return all(map(is_chat_message, obj))
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Literal, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class AzureDeploymentConfig:
     """Configuration for a single Azure OpenAI deployment endpoint."""
 
@@ -1,20 +1,35 @@
 import logging
 import threading
 import time
+from collections import Counter, deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional
 
-from openai import AzureOpenAI, RateLimitError
+from openai import AsyncAzureOpenAI, AzureOpenAI, RateLimitError
 
 from azure_openai_blaster.azure_deployment import AzureDeploymentConfig
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+_STREAM_USAGE_API_VERSION = "2024-09-01"
+"""First API version whose streams accept `stream_options.include_usage`."""
+
+
+@dataclass(slots=True, eq=False)
 class AzureEndpointState:
+    """
+    Mutable runtime state for one deployment.
+
+    Compared and hashed by identity: two states are only equal if they are
+    the same object, so they can be used as dict keys or set members.
+    """
+
     cfg: AzureDeploymentConfig
     """Configuration for this endpoint."""
     client: AzureOpenAI
     """HTTP client for this endpoint."""
+    async_client: Optional[AsyncAzureOpenAI] = None
+    """Async HTTP client for this endpoint; required for the async API."""
 
     # Availability / cooldown
     cooldown_until: float = 0.0
@@ -32,51 +47,107 @@ class AzureEndpointState:
 
     # Counters / observability
     total_requests: int = 0
+    """Successful requests; updated without the lock, so concurrent successes
+    may occasionally go uncounted. Treat it as approximate."""
     total_rate_limits: int = 0
 
     # error tracking
-    error_counts: Dict[str, int] = field(default_factory=dict)
+    error_counts: Counter[str] = field(default_factory=Counter)
     """Count of errors by exception type name."""
-    error_samples: List[str] = field(default_factory=list)
-    """Sample error messages for debugging/reporting."""
+    error_samples: Deque[str] = field(default_factory=deque)
+    """Most recent error messages for debugging/reporting."""
     max_error_samples: int = 50
-    """Maximum number of error messages to keep."""
+    """Maximum number of error messages to keep; older ones are dropped."""
 
     # auto-disable threshold
     auto_disable_threshold: int = 5
     """Consecutive failures required before auto-disabling this endpoint."""
 
+    # transient-error backoff bounds
+    max_backoff_shift: int = 20
+    """Cap on the backoff exponent, so the multiplier never exceeds 2**20."""
+    max_backoff_seconds: float = 300.0
+    """Upper bound on a single transient-error cooldown, in seconds."""
+
     lock: threading.Lock = field(default_factory=threading.Lock)
 
+    completion_kwargs: Dict[str, Any] = field(init=False, repr=False)
+    """Per-endpoint `chat.completions.create` kwargs derived from cfg."""
+    stream_kwargs: Dict[str, Any] = field(init=False, repr=False)
+    """`completion_kwargs` plus the stream options cfg.api_version supports."""
+
+    _listeners: List[Callable[[], None]] = field(
+        init=False, repr=False, default_factory=list
+    )
+    """Callbacks run (outside the lock) when this endpoint gets disabled."""
+
+    def __post_init__(self) -> None:
+        self.error_samples = deque(self.error_samples, maxlen=self.max_error_samples)
+        self.completion_kwargs = {
+            "model": self.cfg.model,
+            "temperature": self.cfg.temperature,
+            "max_completion_tokens": self.cfg.max_completion_tokens,
+        }
+        self.stream_kwargs = dict(self.completion_kwargs)
+        # Ask for a final usage-only chunk where the API version supports it;
+        # older versions reject `stream_options`, so their streams report no
+        # usage. Date versions compare as strings ("2024-09-01-preview"), and
+        # undated ones ("preview", "latest") sort after every date.
+        if self.cfg.api_version >= _STREAM_USAGE_API_VERSION:
+            self.stream_kwargs["stream_options"] = {"include_usage": True}
+
     def available(self, now: Optional[float] = None) -> bool:
-        """Return True if the endpoint can be used right now."""
+        """
+        Return True if the endpoint can be used right now.
+
+        Callers checking several endpoints in one pass (e.g. the scheduler)
+        should read `time.monotonic()` once and pass it as `now`, rather than
+        letting each call read the clock.
+        """
         if self.disabled:
             return False
         if now is None:
             now = time.monotonic()
         return now >= self.cooldown_until
 
-    def _record_error(self, exc: BaseException) -> None:
+    def _record_error(self, exc: BaseException) -> str:
         """
         Internal helper; caller must hold self.lock.
         Updates last_error, error_counts, error_samples, and rate-limit counter.
+        Returns the `"<ExcType>: <message>"` summary so callers can reuse it.
         """
         self.last_error = exc
 
         key = type(exc).__name__
-        self.error_counts[key] = self.error_counts.get(key, 0) + 1
+        self.error_counts[key] += 1
 
-        # Track a bounded list of example error messages
-        if len(self.error_samples) < self.max_error_samples:
-            self.error_samples.append(f"{key}: {exc}")
+        # Bounded ring buffer; keeps the most recent error messages
+        summary = f"{key}: {exc}"
+        self.error_samples.append(summary)
 
         # Special-case rate limits for observability
         if isinstance(exc, RateLimitError):
             self.total_rate_limits += 1
 
-    def _maybe_auto_disable(self, exc: BaseException) -> None:
+        return summary
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """
+        Register `callback` to be called whenever this endpoint is disabled,
+        e.g. so a scheduler can wake threads waiting on a cooldown.
+        """
+        self._listeners.append(callback)
+
+    def _notify_listeners(self) -> None:
+        """Run the registered callbacks; caller must not hold self.lock."""
+        for callback in self._listeners:
+            callback()
+
+    def _maybe_auto_disable(self, exc: BaseException, summary: str) -> bool:
         """
         Auto-disable if the failure streak has exceeded the configured threshold.
+        `summary` is the string returned by _record_error for `exc`.
+        Returns True if this call disabled the endpoint.
         Caller must hold self.lock.
         """
         if (
@@ -87,12 +158,15 @@ class AzureEndpointState:
             self.disabled = True
             self.disabled_reason = (
                 f"Auto-disabled after {self.failure_streak} consecutive failures; "
-                f"last error: {type(exc).__name__}: {exc}"
+                f"last error: {summary}"
             )
-            logging.warning(
-                f"Endpoint {self.cfg.name} auto-disabled due to repeated failures. "
-                f"Last error: {exc}"
+            logger.warning(
+                "Endpoint %s auto-disabled due to repeated failures. Last error: %s",
+                self.cfg.name,
+                exc,
             )
+            return True
+        return False
 
     def set_cooldown(
         self,
@@ -117,23 +191,31 @@ class AzureEndpointState:
         - This avoids race conditions where multiple threads attempt to
           adjust cooldown from slightly different time references.
         """
+        disabled_now = False
         with self.lock:
             if exc is not None:
-                self._record_error(exc)
+                summary = self._record_error(exc)
 
                 # Auto-disable if we’ve crossed the configured threshold
-                self._maybe_auto_disable(exc)
+                disabled_now = self._maybe_auto_disable(exc, summary)
 
             # Extend cooldown only if it increases the window.
             if cooldown_until > self.cooldown_until:
                 self.cooldown_until = cooldown_until
 
+        if disabled_now:
+            self._notify_listeners()
+
     def note_success(self) -> None:
-        """Reset transient error tracking on a successful call."""
-        with self.lock:
-            self.failure_streak = 0
-            self.last_error = None
-            self.total_requests += 1
+        """
+        Reset transient error tracking on a successful call.
+
+        This is the hot path, so it does not take self.lock: the resets are
+        plain attribute stores, and `total_requests` is a best-effort counter.
+        """
+        self.failure_streak = 0
+        self.last_error = None
+        self.total_requests += 1
 
     def note_transient_error(
         self,
@@ -143,21 +225,26 @@ class AzureEndpointState:
         """
         Record a transient infra / timeout error and back off progressively.
 
-        The cooldown is exponential in the failure streak:
-        backoff = base_cooldown * (2 ** (failure_streak - 1))
+        The cooldown is exponential in the failure streak, bounded by
+        `max_backoff_shift` and `max_backoff_seconds`:
+        backoff = min(base_cooldown * 2 ** (failure_streak - 1), max_backoff_seconds)
         """
         now = time.monotonic()
         with self.lock:
             self.failure_streak += 1
-            self._record_error(exc)
+            summary = self._record_error(exc)
 
-            backoff = base_cooldown * (2 ** (self.failure_streak - 1))
+            shift = min(self.failure_streak - 1, self.max_backoff_shift)
+            backoff = min(base_cooldown * (1 << shift), self.max_backoff_seconds)
             new_until = now + backoff
             if new_until > self.cooldown_until:
                 self.cooldown_until = new_until
 
             # Auto-disable if we’ve crossed the configured threshold
-            self._maybe_auto_disable(exc)
+            disabled_now = self._maybe_auto_disable(exc, summary)
+
+        if disabled_now:
+            self._notify_listeners()
 
     def disable(self, reason: str) -> None:
         """Permanently take this endpoint out of rotation due to config errors."""
@@ -165,21 +252,33 @@ class AzureEndpointState:
             self.disabled = True
             self.disabled_reason = reason
 
+        self._notify_listeners()
+
     def report(self) -> Dict[str, Any]:
         """
         Snapshot of this endpoint's state and error statistics,
         suitable for logging or metrics export.
         """
         with self.lock:
-            return {
+            snapshot: Dict[str, Any] = {
                 "endpoint": getattr(self.cfg, "name", repr(self.cfg)),
                 "disabled": self.disabled,
                 "disabled_reason": self.disabled_reason,
                 "cooldown_until": self.cooldown_until,
                 "failure_streak": self.failure_streak,
-                "last_error": repr(self.last_error) if self.last_error else None,
+                "last_error": self.last_error,
                 "total_requests": self.total_requests,
                 "total_rate_limits": self.total_rate_limits,
-                "error_counts": dict(self.error_counts),
-                "error_samples": list(self.error_samples),
             }
+            error_counts = self.error_counts
+            error_samples = self.error_samples
+
+        # Copy and format outside the lock so error updates aren't held up.
+        # The container copies run in C without releasing the GIL, so they
+        # cannot observe a half-applied update; they may just include errors
+        # recorded after the scalar fields above were read.
+        last_error = snapshot["last_error"]
+        snapshot["last_error"] = repr(last_error) if last_error else None
+        snapshot["error_counts"] = dict(error_counts)
+        snapshot["error_samples"] = list(error_samples)
+        return snapshot
@@ -1,19 +1,35 @@
+import asyncio
 import logging
 import threading
+from collections import deque
 from concurrent.futures import Future
 from dataclasses import dataclass
-from queue import Empty, Queue
 from typing import Any, Dict, Iterable, List, Optional
 
+from openai import AsyncAzureOpenAI
 from openai.types.chat import ChatCompletionMessageParam
 
+from azure_openai_blaster._oai_typeguard import is_chat_message_list
 from azure_openai_blaster.azure_endpoint_state import AzureEndpointState
-from azure_openai_blaster.initialization import build_endpoint_states
-from azure_openai_blaster.requesting import invoke_endpoint
+from azure_openai_blaster.initialization import (
+    build_endpoint_states,
+    release_endpoint_states,
+)
+from azure_openai_blaster.requesting import (
+    RequestResult,
+    ainvoke_endpoint,
+    invoke_endpoint,
+    invoke_endpoint_choices,
+)
 from azure_openai_blaster.scheduler import WeightedRRScheduler
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+_WORKER_BATCH_SIZE = 8
+"""Maximum jobs a worker takes from the queue per lock acquisition."""
+
+
+@dataclass(slots=True)
 class _Job:
     """Internal representation of a single chat request."""
 
@@ -28,6 +44,82 @@ class _Job:
     """Count of how many times this job has been retried.
     Used for filtering problematic jobs.
     """
+    started: bool = False
+    """Whether the future has been marked running by a worker."""
+
+
+def _coalesce(jobs: Iterable[_Job]) -> list[list[_Job]]:
+    """
+    Group jobs that are the same request, so that each group can be served by
+    one `n=len(group)` call.
+
+    Only fresh, non-streaming jobs sharing the very same `messages` list (as
+    when sampling one prompt several times) and equal kwargs are grouped.
+    """
+    groups: list[list[_Job]] = []
+    for job in jobs:
+        if not job.started and not job.kwargs.get("stream"):
+            for group in groups:
+                head = group[0]
+                if (
+                    head.messages is job.messages
+                    and not head.started
+                    and head.kwargs == job.kwargs
+                ):
+                    group.append(job)
+                    break
+            else:
+                groups.append([job])
+        else:
+            groups.append([job])
+    return groups
+
+
+class _JobQueue:
+    """
+    Minimal unbounded FIFO shared by the workers.
+
+    Unlike `queue.Queue`, there is no `task_done()`/`join()` accounting, so
+    each job costs one lock round-trip on put and one on get.
+    """
+
+    __slots__ = ("_items", "_cv")
+
+    def __init__(self) -> None:
+        self._items: deque[Optional[_Job]] = deque()
+        """Pending jobs; a `None` sentinel tells a worker to exit."""
+        self._cv = threading.Condition(threading.Lock())
+
+    def put(self, item: Optional[_Job]) -> None:
+        with self._cv:
+            self._items.append(item)
+            self._cv.notify()
+
+    def get(self) -> Optional[_Job]:
+        """Block until an item is available and return it."""
+        with self._cv:
+            while not self._items:
+                self._cv.wait()
+            return self._items.popleft()
+
+    def drain(self, max_n: int, num_consumers: int = 1) -> list[_Job]:
+        """
+        Pop up to `max_n` ready jobs under a single lock acquisition.
+
+        Only one consumer's fair share of the backlog (`len // num_consumers`)
+        is taken, so idle workers are never starved while one worker holds a
+        batch. Stops at a `None` sentinel, leaving it for a blocking `get()`.
+        """
+        jobs: list[_Job] = []
+        with self._cv:
+            items = self._items
+            limit = min(max_n, len(items) // num_consumers)
+            while len(jobs) < limit:
+                job = items[0]
+                if job is None:
+                    break
+                jobs.append(items.popleft())
+        return jobs
 
 
 class AzureLLMBlaster:
@@ -49,6 +141,7 @@ class AzureLLMBlaster:
         num_workers: int = 8,
         max_job_retry: int = 5,
         worker_polling_interval: float = 0.5,
+        coalesce_requests: bool = False,
     ):
         """
         Initialize a new AzureLLMBlaster.
@@ -60,24 +153,33 @@ class AzureLLMBlaster:
                 internal queue and execute them. Defaults to 8.
             max_job_retry: Maximum number of attempts for a single job before \
                 it is considered problematic and dropped. Defaults to 5.
-            worker_polling_interval: Interval, in seconds, for workers to poll the job queue \
-                when idle. Defaults to 0.5.
+            worker_polling_interval: Deprecated and ignored; workers block on the job \
+                queue and are woken by `close()`. Kept for backwards compatibility.
+            coalesce_requests: Opt in to serving queued requests that share the same \
+                messages list and kwargs with one `n`-choice call. Only enable it for \
+                deployments and models that support `n`. Defaults to False.
         """
         if not endpoints:
             raise ValueError("AzureLLMBlaster requires at least one endpoint.")
 
         self._endpoints = endpoints
         self._scheduler = WeightedRRScheduler(endpoints)
-        self._queue: Queue[_Job] = Queue()
+        self._queue = _JobQueue()
         self._num_workers = num_workers
         self._max_job_retry = max_job_retry
         """Mark job as problematic after this many retries."""
+        self._coalesce_requests = coalesce_requests
+        """Whether identical queued jobs are grouped into one `n` request."""
 
         self._stop = threading.Event()
         self._threads: list[threading.Thread] = []
         self._closed = False
+        self._owns_clients = False
+        """Whether `close()` releases the endpoints' clients; see `from_config`."""
+        self._unused_async_clients: List[AsyncAzureOpenAI] = []
+        """Async clients released by `close()`, for `aclose()` to close."""
         self._worker_polling_interval = worker_polling_interval
-        """Interval (seconds) for workers to poll the job queue."""
+        """(Unused) Kept for backwards compatibility with older configs."""
 
         for i in range(num_workers):
             t = threading.Thread(
@@ -109,10 +211,12 @@ class AzureLLMBlaster:
               // Optional overrides for __init__ defaults:
               // "num_workers": 24,
               // "max_job_retry": 5,
-              // "worker_polling_interval": 0.5
+              // "worker_polling_interval": 0.5,
+              // "coalesce_requests": true
             }
 
-        Values omitted from the config fall back to the defaults.
+        Values omitted from the config fall back to the defaults. The blaster
+        owns the endpoints built here, so `close()` also releases their clients.
         """
         endpoints = build_endpoint_states(config)
 
@@ -121,9 +225,11 @@ class AzureLLMBlaster:
             init_kwargs["num_workers"] = num_workers
 
             if "num_workers" in config:
-                logging.info(
+                logger.info(
                     "Overriding AzureLLMBlaster num_workers with explicit argument. "
-                    f"{config['num_workers']} -> {num_workers}",
+                    "%s -> %s",
+                    config["num_workers"],
+                    num_workers,
                 )
         elif "num_workers" in config:
             init_kwargs["num_workers"] = config["num_workers"]
@@ -132,8 +238,14 @@ class AzureLLMBlaster:
             init_kwargs["max_job_retry"] = config["max_job_retry"]
         if "worker_polling_interval" in config:
             init_kwargs["worker_polling_interval"] = config["worker_polling_interval"]
+        if "coalesce_requests" in config:
+            init_kwargs["coalesce_requests"] = config["coalesce_requests"]
 
-        return cls(endpoints=endpoints, **init_kwargs)
+        blaster = cls(endpoints=endpoints, **init_kwargs)
+        # The endpoints were built for this blaster alone, so it owns their
+        # clients; endpoints passed to the constructor belong to the caller.
+        blaster._owns_clients = True
+        return blaster
 
     @classmethod
     def from_config_file(
@@ -163,7 +275,8 @@ class AzureLLMBlaster:
         Parameters
         ----------
         messages : iterable of ChatCompletionMessageParam
-            Standard OpenAI-style chat messages.
+            Standard OpenAI-style chat messages. A list is used as-is rather
+            than copied, so do not mutate it until the future resolves.
         **kwargs :
             Additional keyword arguments forwarded to `invoke_endpoint`,
             e.g. `stream=True` if desired.
@@ -176,12 +289,15 @@ class AzureLLMBlaster:
         ------
         RuntimeError
             If the blaster has been closed and cannot be used.
+        ValueError
+            If `messages` is not a valid list of chat messages.
         """
         if self._closed:
             raise RuntimeError("AzureLLMBlaster has been closed and cannot be used.")
 
         future: Future[str] = Future()
-        job = _Job(messages=list(messages), kwargs=kwargs, future=future)
+        msgs = self._validated_messages(messages)
+        job = _Job(messages=msgs, kwargs=kwargs, future=future)
         self._queue.put(job)
 
         # Block until a worker sets result or exception
@@ -217,22 +333,117 @@ class AzureLLMBlaster:
         # Block until a worker sets result or exception
         return self.submit_chat_completion(messages, **kwargs).result()
 
+    @staticmethod
+    def _validated_messages(
+        messages: Iterable[ChatCompletionMessageParam],
+    ) -> List[ChatCompletionMessageParam]:
+        """
+        Materialize and validate `messages` once per submission, so the
+        caller gets the error and retries skip the check.
+        """
+        # Avoid copying the common case; other iterables are materialized.
+        msgs = messages if isinstance(messages, list) else list(messages)
+        if not is_chat_message_list(msgs):
+            raise ValueError("messages must be a list of ChatCompletionMessageParam")
+        return msgs
+
+    async def achat_completion(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        **kwargs: Any,
+    ) -> str:
+        """
+        Async chat completion, run directly on the caller's event loop.
+
+        Unlike `submit_chat_completion`, this does not go through the worker
+        threads: many calls can be awaited concurrently (e.g. with
+        `asyncio.gather`) over each endpoint's async client, while sharing the
+        same scheduler, cooldowns and retry policy as the sync API.
+
+        Parameters
+        ----------
+        messages : iterable of ChatCompletionMessageParam
+            Standard OpenAI-style chat messages.
+        **kwargs :
+            Additional keyword arguments forwarded to `ainvoke_endpoint`,
+            e.g. `stream=True` if desired.
+
+        Returns
+        -------
+        str
+            The response content from the model.
+
+        Raises
+        ------
+        RuntimeError
+            If the blaster has been closed, or an endpoint has no async client.
+        ValueError
+            If `messages` is not a valid list of chat messages.
+        BaseException
+            Propagates non-retryable errors from the underlying endpoint.
+        """
+        if self._closed:
+            raise RuntimeError("AzureLLMBlaster has been closed and cannot be used.")
+
+        msgs = self._validated_messages(messages)
+        retry_count = 0
+        while True:
+            ep = await self._scheduler.anext()
+            result = await ainvoke_endpoint(ep, msgs, _validated=True, **kwargs)
+            if result.ok:
+                return result.response or ""
+
+            retry_count += 1
+            error = self._terminal_error(result, retry_count)
+            if error is not None:
+                raise error
+
     def close(self, wait: bool = True) -> None:
         """
         Signal all workers to stop and optionally wait for them.
 
         This does NOT drain the queue; any pending jobs will never be processed
         once the workers exit. Call this when you are done using the blaster.
+
+        With `wait=True`, a blaster built by `from_config` also releases its
+        endpoints' clients once all workers have exited (see
+        `release_endpoint_states`): sync clients and connection pools no other
+        blaster still uses are closed. Endpoints passed to the constructor
+        belong to the caller, who releases them once every blaster using them
+        is closed.
+
+        Async clients can only be closed from an event loop, so `close()`
+        leaves them open; they are closed by `aclose()`, which may also be
+        awaited after `close()`. If the async API was used, prefer `aclose()`.
         """
         if self._closed:
             return
         self._closed = True
         self._stop.set()
 
+        # One sentinel per worker wakes every thread blocked in `get()`.
+        for _ in self._threads:
+            self._queue.put(None)
+
         if wait:
             for t in self._threads:
                 t.join()
 
+            # Workers are gone, so no request can still be using a client.
+            if self._owns_clients:
+                self._unused_async_clients = release_endpoint_states(self._endpoints)
+
+    async def aclose(self) -> None:
+        """
+        Async counterpart of `close()`: stops the workers, then closes the
+        released async clients as well. Call it from the event loop the async
+        API was used on.
+        """
+        await asyncio.to_thread(self.close)
+        clients, self._unused_async_clients = self._unused_async_clients, []
+        for client in clients:
+            await client.close()
+
     # ---------------------------------------------------------------------
     # Internal worker logic
     # ---------------------------------------------------------------------
@@ -241,63 +452,158 @@ class AzureLLMBlaster:
         """Worker thread main loop: pull jobs, route to endpoint, handle retry."""
         name = threading.current_thread().name
 
-        while not self._stop.is_set():
-            try:
-                job: _Job = self._queue.get(timeout=self._worker_polling_interval)
-            except Empty:
-                logging.debug(f"{name}: no job; checking for stop signal.")
-                continue
-
-            try:
-                logging.debug(f"{name}: processing job.")
-                self._handle_job(job)
-            finally:
-                # We don't rely on join() semantics here, but keeping this
-                # correct is cheap if you ever want to use queue.join().
-                logging.debug(f"{name}: job done.")
-                self._queue.task_done()
-
-    def _handle_job(self, job: _Job) -> None:
-        """Process a single job using the scheduler + invoke_endpoint."""
-        # If the future is already resolved (e.g., caller cancelled), skip work.
-        if job.future.done():
-            return
-
-        # Block until some endpoint is available
-        ep = self._scheduler.next()
+        while True:
+            job = self._queue.get()
+            if job is None or self._stop.is_set():
+                # Sentinel from close(), or a job picked up after close(); the
+                # queue is intentionally not drained on shutdown.
+                logger.debug("%s: stop signal received; exiting.", name)
+                return
+
+            drained = self._queue.drain(_WORKER_BATCH_SIZE - 1, self._num_workers)
+            batch = (job, *drained)
+            groups = (
+                _coalesce(batch) if self._coalesce_requests else [[j] for j in batch]
+            )
+            for group in groups:
+                if self._stop.is_set():
+                    return
+                logger.debug("%s: processing %d job(s).", name, len(group))
+                if len(group) == 1:
+                    self._handle_job(group[0])
+                else:
+                    self._handle_group(group)
+                logger.debug("%s: job done.", name)
 
-        result = invoke_endpoint(ep, job.messages, **job.kwargs)
+    def _handle_job(self, job: _Job, ep: Optional[AzureEndpointState] = None) -> None:
+        """
+        Process a single job, keeping the worker alive: an unexpected
+        exception (e.g. an unclassified API error, or no endpoint left) is
+        set on the job's future instead of escaping the worker loop.
+        """
+        try:
+            self._run_job(job, ep)
+        except Exception as e:
+            self._fail_jobs([job], e)
 
-        if result.ok:
-            if not job.future.done():
+    def _run_job(self, job: _Job, ep: Optional[AzureEndpointState]) -> None:
+        """
+        Process a single job using the scheduler + invoke_endpoint, starting
+        on `ep` if given.
+        """
+        # On first dispatch, mark the future RUNNING; this fails if the caller
+        # cancelled it while queued. A running future can no longer be
+        # cancelled, so only this worker resolves it from here on and the
+        # result can be set without further done() checks.
+        if not job.started:
+            if not job.future.set_running_or_notify_cancel():
+                return
+            job.started = True
+
+        if ep is None:
+            # Block until some endpoint is available
+            ep = self._scheduler.next()
+
+        while True:
+            result = invoke_endpoint(ep, job.messages, _validated=True, **job.kwargs)
+
+            if result.ok:
                 # `response` is a string (see RequestResult in requesting.py)
                 job.future.set_result(result.response or "")
+                return
+
+            job.retry_count += 1
+            error = self._terminal_error(result, job.retry_count)
+            if error is not None:
+                job.future.set_exception(error)
+                return
+
+            # Transient error: retry right away on this worker if the scheduler
+            # has an endpoint ready. If every endpoint is cooling down, requeue
+            # the job instead of parking this worker on the cooldown.
+            # Note: we do NOT touch the future here; caller still waits.
+            next_ep = self._scheduler.try_next()
+            if next_ep is None:
+                self._queue.put(job)
+                return
+            ep = next_ep
+
+    def _handle_group(self, jobs: list[_Job]) -> None:
+        """Serve identical jobs (see `_coalesce`) with a single `n` request."""
+        live: list[_Job] = []
+        for job in jobs:
+            if job.future.set_running_or_notify_cancel():
+                job.started = True
+                live.append(job)
+        if len(live) <= 1:
+            for job in live:
+                self._handle_job(job)
             return
 
-        job.retry_count += 1
-        if job.retry_count >= self._max_job_retry:
-            # Too many retries: surface to caller via the future.
-            if not job.future.done():
-                if result.error is not None:
-                    job.future.set_exception(result.error)
-                else:
-                    job.future.set_exception(
-                        TimeoutError(
-                            f"Job deemed problematic after {job.retry_count} tries."
-                        )
-                    )
+        try:
+            ep = self._scheduler.next()
+            result = invoke_endpoint_choices(
+                ep, live[0].messages, len(live), _validated=True
+            )
+        except Exception as e:
+            # Handled below like a failed result; each job then surfaces its
+            # own outcome.
+            logger.debug("Coalesced request raised %r; running jobs alone.", e)
+            result = None
+
+        if (
+            result is not None
+            and result.ok
+            and result.choices
+            and len(result.choices) == len(live)
+        ):
+            for job, content in zip(live, result.choices):
+                job.future.set_result(content)
             return
 
-        if result.retryable:
-            # Transient error: requeue the same job to be tried again later.
-            # Note: we do NOT touch the future here; caller still waits.
-            self._queue.put(job)
-        else:
-            # Non-retryable error: surface to caller via the future.
-            if not job.future.done():
-                if result.error is not None:
-                    job.future.set_exception(result.error)
-                else:
-                    job.future.set_exception(
-                        RuntimeError("LLM request failed without an explicit error.")
-                    )
+        # The shared call failed, or the endpoint ignored `n`. Its failure
+        # says nothing about the jobs themselves (a deployment may reject
+        # `n` > 1 outright), so it does not count as an attempt: run each job
+        # on its own. Jobs are only started here if an endpoint is ready;
+        # otherwise they are requeued rather than parking this worker on the
+        # cooldown once per job.
+        for job in live:
+            try:
+                ep = self._scheduler.try_next()
+            except Exception as e:
+                self._fail_jobs([job], e)
+                continue
+            if ep is None:
+                self._queue.put(job)
+            else:
+                self._handle_job(job, ep)
+
+    @staticmethod
+    def _fail_jobs(jobs: Iterable[_Job], error: Exception) -> None:
+        """Resolve the started, unresolved futures of `jobs` with `error`."""
+        logger.error("Request failed with an unexpected error: %r", error)
+        for job in jobs:
+            # Started futures are only resolved by the worker holding the job.
+            if job.started and not job.future.done():
+                job.future.set_exception(error)
+
+    def _terminal_error(
+        self, result: RequestResult, retry_count: int
+    ) -> Optional[BaseException]:
+        """
+        Return the exception to surface for a failed attempt, or None if the
+        request should be retried.
+        """
+        if retry_count >= self._max_job_retry:
+            # Too many retries: surface to caller.
+            if result.error is not None:
+                return result.error
+            return TimeoutError(f"Job deemed problematic after {retry_count} tries.")
+
+        if not result.retryable:
+            # Non-retryable error: surface to caller.
+            if result.error is not None:
+                return result.error
+            return RuntimeError("LLM request failed without an explicit error.")
+
+        return None
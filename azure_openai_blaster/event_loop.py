@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import sys
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _fast_loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """
+    Return `new_event_loop` from uvloop (or winloop on Windows) if installed,
+    else None so asyncio uses its default loop.
+    """
+    try:
+        if sys.platform == "win32":
+            import winloop as loop_impl
+        else:
+            import uvloop as loop_impl
+    except ImportError:
+        return None
+    logger.debug("Using %s event loop", loop_impl.__name__)
+    return loop_impl.new_event_loop
+
+
+def run_async(main: Coroutine[Any, Any, T]) -> T:
+    """
+    Drop-in replacement for `asyncio.run(main)` that runs on uvloop (winloop
+    on Windows) when available, falling back to the stock asyncio loop.
+
+    The libuv-based loops have lower per-event overhead, which pays off when
+    many requests are in flight through `AzureLLMBlaster.achat_completion`.
+    Install them with the `fast` extra: `pip install azure_openai_blaster[fast]`.
+    The process-wide event loop policy is left untouched.
+    """
+    with asyncio.Runner(loop_factory=_fast_loop_factory()) as runner:
+        return runner.run(main)
@@ -1,47 +1,336 @@
+import asyncio
+import hashlib
+import importlib.util
 import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar
+from urllib.parse import urlparse
 
+import httpx
+from azure.core.credentials import TokenCredential
 from azure.identity import (
     AzureCliCredential,
     DefaultAzureCredential,
     InteractiveBrowserCredential,
+    get_bearer_token_provider,
+)
+from openai import (
+    AsyncAzureOpenAI,
+    AzureOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
 )
-from openai import AzureOpenAI
 
 from azure_openai_blaster.azure_deployment import AzureDeploymentConfig
 from azure_openai_blaster.azure_endpoint_state import AzureEndpointState
 
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C", AzureOpenAI, AsyncAzureOpenAI)
+
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=1000,
+    max_keepalive_connections=256,
+    keepalive_expiry=120.0,
+)
+"""Connection pool limits for the shared per-host HTTP clients.
+
+Keeps idle sockets around long enough to be reused between bursts (httpx's
+default expiry is 5s) while staying under Azure's ~4 minute idle timeout.
+"""
+
+_HTTP2 = importlib.util.find_spec("h2") is not None
+"""Offer HTTP/2 when `h2` is installed (the `http2` extra), so concurrent
+requests to a host multiplex over a few connections instead of one each.
+Servers without HTTP/2 are still served over HTTP/1.1 via ALPN."""
+
+_CREDENTIAL_FACTORIES: dict[str, Callable[[], TokenCredential]] = {
+    "default": DefaultAzureCredential,
+    "az": AzureCliCredential,
+    "interactive": InteractiveBrowserCredential,
+}
+"""Credential constructors keyed by the special `api_key` values."""
 
-def make_client(cfg: AzureDeploymentConfig) -> AzureOpenAI:
-    if cfg.api_key.lower() not in ("default", "az", "interactive") and cfg.api_key:
-        return AzureOpenAI(
-            api_key=cfg.api_key,
-            azure_endpoint=cfg.endpoint,
-            api_version=cfg.api_version,
+_TOKEN_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+_CRED_CACHE: dict[str, TokenCredential] = {}
+"""Process-wide credentials keyed by auth mode ("default", "az", "interactive")."""
+_PROVIDER_CACHE: dict[str, Callable[[], str]] = {}
+"""Bearer token providers keyed by auth mode; each caches and refreshes its token."""
+
+
+def _get_credential(mode: str) -> TokenCredential:
+    """Return the shared credential for `mode`, creating it on first use."""
+    cred = _CRED_CACHE.get(mode)
+    if cred is None:
+        cred = _CRED_CACHE[mode] = _CREDENTIAL_FACTORIES[mode]()
+    return cred
+
+
+def _get_token_provider(mode: str) -> Callable[[], str]:
+    """Return the shared token provider for `mode`, creating it on first use."""
+    provider = _PROVIDER_CACHE.get(mode)
+    if provider is None:
+        provider = _PROVIDER_CACHE[mode] = get_bearer_token_provider(
+            _get_credential(mode), _TOKEN_SCOPE
         )
+    return provider
 
-    # Token-based auth
-    if cfg.api_key.lower() == "interactive":
-        cred = InteractiveBrowserCredential()
-        logging.info(f"Using InteractiveBrowserCredential for deployment '{cfg.name}'")
-    elif cfg.api_key.lower() == "az":
-        cred = AzureCliCredential()
-        logging.info(f"Using AzureCliCredential for deployment '{cfg.name}'")
-    else:
-        logging.info(f"Using DefaultAzureCredential for deployment '{cfg.name}'")
-        cred = DefaultAzureCredential()
 
-    token = cred.get_token("https://cognitiveservices.azure.com/.default")
-    return AzureOpenAI(
-        api_key=token.token,
-        azure_endpoint=cfg.endpoint,
-        api_version=cfg.api_version,
-    )
+def _auth_mode(cfg: AzureDeploymentConfig) -> Optional[str]:
+    """Return the token auth mode for `cfg`, or None if it uses a plain API key."""
+    mode = (cfg.api_key or "").lower()
+    if mode in _CREDENTIAL_FACTORIES:
+        return mode
+    if cfg.api_key:
+        return None
+    # No key at all: fall back to DefaultAzureCredential.
+    return "default"
+
+
+def _client_kwargs(cfg: AzureDeploymentConfig) -> dict[str, Any]:
+    """Resolve `cfg` into AzureOpenAI/AsyncAzureOpenAI constructor kwargs."""
+    kwargs: dict[str, Any] = {
+        "azure_endpoint": cfg.endpoint,
+        "api_version": cfg.api_version,
+    }
+    mode = _auth_mode(cfg)
+    if mode is None:
+        kwargs["api_key"] = cfg.api_key
+        return kwargs
+
+    # Token-based auth. The provider fetches tokens lazily and refreshes them
+    # before expiry, so long-running processes keep working past ~1h.
+    cred = _get_credential(mode)
+    logger.info("Using %s for deployment '%s'", type(cred).__name__, cfg.name)
+    kwargs["azure_ad_token_provider"] = _get_token_provider(mode)
+    return kwargs
+
+
+def make_client(
+    cfg: AzureDeploymentConfig, http_client: Optional[httpx.Client] = None
+) -> AzureOpenAI:
+    """
+    Build an AzureOpenAI client for `cfg`.
+
+    `http_client` may be shared between deployments on the same host so they
+    reuse one connection pool; when omitted the SDK creates its own.
+    """
+    return AzureOpenAI(http_client=http_client, **_client_kwargs(cfg))
+
+
+def make_async_client(
+    cfg: AzureDeploymentConfig, http_client: Optional[httpx.AsyncClient] = None
+) -> AsyncAzureOpenAI:
+    """Build an AsyncAzureOpenAI client for `cfg`; see `make_client`."""
+    return AsyncAzureOpenAI(http_client=http_client, **_client_kwargs(cfg))
+
+
+@dataclass(slots=True)
+class _Pooled(Generic[C]):
+    """A pooled SDK client and the number of endpoint states holding it."""
+
+    client: C
+    host: str
+    refs: int = 0
+
+
+_ClientKey = tuple[str, str, str]
+"""(endpoint, api_version, auth fingerprint); see `_pool_key`."""
+
+_POOL_LOCK = threading.Lock()
+_CLIENT_POOL: dict[_ClientKey, _Pooled[AzureOpenAI]] = {}
+"""Sync SDK clients keyed by connection identity.
+
+An SDK client is not tied to a model or deployment, so every deployment with
+the same connection identity shares one, across `build_endpoint_states` calls.
+"""
+_HTTP_POOL: dict[str, httpx.Client] = {}
+"""Sync HTTP connection pools keyed by endpoint host."""
+_ASYNC_CLIENT_POOL: dict[
+    tuple[_ClientKey, asyncio.AbstractEventLoop], _Pooled[AsyncAzureOpenAI]
+] = {}
+"""Async SDK clients keyed by connection identity and event loop.
+
+Async connections belong to the loop they were opened on, so async clients
+are only shared between builds running on the same loop.
+"""
+_ASYNC_HTTP_POOL: dict[tuple[str, asyncio.AbstractEventLoop], httpx.AsyncClient] = {}
+"""Async HTTP connection pools keyed by endpoint host and event loop."""
+
+
+def _pool_key(cfg: AzureDeploymentConfig) -> _ClientKey:
+    """Connection identity of `cfg`; API keys are only kept as a digest."""
+    mode = _auth_mode(cfg)
+    if mode is None:
+        mode = "key:" + hashlib.sha256(cfg.api_key.encode()).hexdigest()
+    return (cfg.endpoint, cfg.api_version, mode)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _acquire_client(key: _ClientKey, host: str, kwargs: dict[str, Any]) -> AzureOpenAI:
+    """Return the pooled sync client for `key`, creating it if needed.
+
+    Caller must hold _POOL_LOCK.
+    """
+    entry = _CLIENT_POOL.get(key)
+    # Clients closed outside the pool (e.g. by hand) are replaced, not reused.
+    if entry is None or entry.client.is_closed():
+        http = _HTTP_POOL.get(host)
+        if http is None or http.is_closed:
+            http = _HTTP_POOL[host] = DefaultHttpxClient(
+                limits=_HTTP_LIMITS, http2=_HTTP2
+            )
+        entry = _CLIENT_POOL[key] = _Pooled(
+            client=AzureOpenAI(http_client=http, **kwargs), host=host
+        )
+    entry.refs += 1
+    return entry.client
+
+
+def _acquire_async_client(
+    key: _ClientKey,
+    host: str,
+    kwargs: dict[str, Any],
+    loop: asyncio.AbstractEventLoop,
+) -> AsyncAzureOpenAI:
+    """Return the pooled async client for `key` on `loop`, creating it if needed.
+
+    Caller must hold _POOL_LOCK.
+    """
+    entry = _ASYNC_CLIENT_POOL.get((key, loop))
+    if entry is None or entry.client.is_closed():
+        http = _ASYNC_HTTP_POOL.get((host, loop))
+        if http is None or http.is_closed:
+            http = _ASYNC_HTTP_POOL[host, loop] = DefaultAsyncHttpxClient(
+                limits=_HTTP_LIMITS, http2=_HTTP2
+            )
+        entry = _ASYNC_CLIENT_POOL[key, loop] = _Pooled(
+            client=AsyncAzureOpenAI(http_client=http, **kwargs), host=host
+        )
+    entry.refs += 1
+    return entry.client
 
 
 def build_endpoint_states(config: dict) -> list[AzureEndpointState]:
+    """
+    Build endpoint states for every deployment in `config`.
+
+    Each endpoint gets both a sync and an async client. Sync clients are
+    pooled process-wide: deployments with the same endpoint, API version and
+    credentials share one client, also across calls (e.g. on config reload),
+    and deployments on the same host share one HTTP connection pool.
+
+    Async connections belong to an event loop, so async clients are pooled
+    the same way but per loop: when called from a running loop, the async
+    clients are shared with other builds on that loop. Otherwise they are
+    shared within this call only, and bind to the first loop that uses them.
+
+    Hand the states to `release_endpoint_states` once done with them (a
+    blaster built by `AzureLLMBlaster.from_config` does so on `close()`)
+    instead of closing their clients directly.
+    """
+    loop = _running_loop()
+    # Per-call async pools, used when no loop is running.
+    local_async: dict[str, httpx.AsyncClient] = {}
     states: list[AzureEndpointState] = []
-    for dep in config["deployments"]:
-        cfg = AzureDeploymentConfig(**dep)
-        client = make_client(cfg)
-        states.append(AzureEndpointState(cfg=cfg, client=client))
+    with _POOL_LOCK:
+        for dep in config["deployments"]:
+            cfg = AzureDeploymentConfig(**dep)
+            key = _pool_key(cfg)
+            host = urlparse(cfg.endpoint).netloc.lower()
+            # Resolve auth once and share it between the sync and async
+            # clients; both call the (sync) token provider on refresh only.
+            kwargs = _client_kwargs(cfg)
+            client = _acquire_client(key, host, kwargs)
+            if loop is not None:
+                async_client = _acquire_async_client(key, host, kwargs, loop)
+            else:
+                http = local_async.get(host)
+                if http is None:
+                    http = local_async[host] = DefaultAsyncHttpxClient(
+                        limits=_HTTP_LIMITS, http2=_HTTP2
+                    )
+                async_client = AsyncAzureOpenAI(http_client=http, **kwargs)
+            states.append(
+                AzureEndpointState(cfg=cfg, client=client, async_client=async_client)
+            )
     return states
+
+
+def release_endpoint_states(
+    states: Iterable[AzureEndpointState],
+) -> list[AsyncAzureOpenAI]:
+    """
+    Release the clients of `states`, closing those no other state still uses.
+
+    Pooled clients (see `build_endpoint_states`) go back to the pool; once
+    their last holder is released they are dropped, and a host's connection
+    pool is closed when no pooled client uses it anymore. Sync clients that
+    did not come from the pool are closed directly.
+
+    Async clients cannot be closed synchronously, so the ones that are now
+    unused are returned instead; await `close()` on each of them (as
+    `AzureLLMBlaster.aclose` does) to close their connections.
+    """
+    to_aclose: list[AsyncAzureOpenAI] = []
+    with _POOL_LOCK:
+        for ep in states:
+            _release_client(ep)
+            if ep.async_client is not None:
+                client = _release_async_client(ep.async_client)
+                if client is not None and not any(c is client for c in to_aclose):
+                    to_aclose.append(client)
+    return to_aclose
+
+
+def _release_client(ep: AzureEndpointState) -> None:
+    """Release `ep.client`; caller must hold _POOL_LOCK."""
+    key = _pool_key(ep.cfg)
+    entry = _CLIENT_POOL.get(key)
+    if entry is None or entry.client is not ep.client:
+        ep.client.close()
+        return
+
+    entry.refs -= 1
+    if entry.refs > 0:
+        return
+    del _CLIENT_POOL[key]
+    if any(e.host == entry.host for e in _CLIENT_POOL.values()):
+        return
+    # Last client on this host: closing it closes the shared pool.
+    _HTTP_POOL.pop(entry.host, None)
+    entry.client.close()
+
+
+def _release_async_client(client: AsyncAzureOpenAI) -> Optional[AsyncAzureOpenAI]:
+    """
+    Release `client` and return it if it should now be closed, or None if
+    it is still in use. Caller must hold _POOL_LOCK.
+    """
+    for pool_key, entry in _ASYNC_CLIENT_POOL.items():
+        if entry.client is client:
+            break
+    else:
+        # Not pooled (built outside a running loop): owned by its states.
+        return client
+
+    entry.refs -= 1
+    if entry.refs > 0:
+        return None
+    del _ASYNC_CLIENT_POOL[pool_key]
+    loop = pool_key[1]
+    if any(
+        e.host == entry.host and k[1] is loop for k, e in _ASYNC_CLIENT_POOL.items()
+    ):
+        return None
+    # Last client on this host and loop: closing it closes the shared pool.
+    _ASYNC_HTTP_POOL.pop((entry.host, loop), None)
+    return client
@@ -1,17 +1,33 @@
+import json
 import logging
 import time
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import Any, Callable, Iterable, Optional
 
-from openai import APITimeoutError, AuthenticationError, BadRequestError, RateLimitError
+from openai import (
+    APIError,
+    APITimeoutError,
+    AuthenticationError,
+    BadRequestError,
+    RateLimitError,
+)
 from openai.types.chat import ChatCompletionMessageParam
 
 from azure_openai_blaster._error_handler import parse_retry_after_seconds
 from azure_openai_blaster._oai_typeguard import is_chat_message_list
 from azure_openai_blaster.azure_endpoint_state import AzureEndpointState
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+try:
+    import orjson
+
+    _json_loads: Callable[[str | bytes], Any] = orjson.loads
+except ImportError:  # optional speedup, installed by the `fast` extra
+    _json_loads = json.loads
+
+
+@dataclass(slots=True)
 class RequestResult:
     """Unified format for LLM endpoint request results."""
 
@@ -23,99 +39,335 @@ class RequestResult:
     """Response content, if successful."""
     error: Optional[BaseException] = None
     """Error encountered, if any."""
+    choices: Optional[list[str]] = None
+    """All choice contents, for requests made with `n` > 1."""
+    prompt_tokens: Optional[int] = None
+    """Prompt tokens reported by the endpoint, if the response included usage."""
+    completion_tokens: Optional[int] = None
+    """Completion tokens reported by the endpoint, if the response included usage."""
+    latency_s: Optional[float] = None
+    """Wall-clock seconds spent on the endpoint call, including failed ones."""
+
+
+_HANDLED_ERRORS = (
+    RateLimitError,
+    AuthenticationError,
+    APITimeoutError,
+    BadRequestError,
+)
+"""Errors classified into a RequestResult; anything else propagates."""
 
 
 def invoke_endpoint(
     ep: AzureEndpointState,
     messages: list[dict] | list[ChatCompletionMessageParam],
+    *,
+    _validated: bool = False,
     **kwargs,
 ) -> RequestResult:
-    if not is_chat_message_list(messages):
+    """
+    Send one chat completion request to `ep` and classify the outcome.
+
+    Pass `_validated=True` when `messages` has already been checked with
+    `is_chat_message_list` (as the blaster does once per submission) to skip
+    re-validating it on every attempt.
+    """
+    if not _validated and not is_chat_message_list(messages):
         raise ValueError("messages must be a list of ChatCompletionMessageParam")
+    started = time.perf_counter()
     try:
-        resp = (
+        resp, usage = (
             _stream_completion(ep, messages)
             if kwargs.get("stream")
             else _completion(ep, messages)
         )
-        ep.note_success()
-        return RequestResult(ok=True, retryable=False, response=resp)
-
-    except RateLimitError as e:
-        retry_after = parse_retry_after_seconds(e)
-
-        if not retry_after:
-            logging.warning(
-                f"RateLimitError from {ep.cfg.name} "
-                "without Retry-After header nor parseable message. "
-                "Defaulting to 15s cooldown. Error: "
-                f"{e}"
-            )
-            retry_after = 15.0
-        else:
-            logging.info(
-                f"RateLimitError from {ep.cfg.name}; "
-                f"setting cooldown for {retry_after} seconds."
-            )
-
-        cooldown_until = time.monotonic() + retry_after
-        ep.set_cooldown(cooldown_until, exc=e)
-        return RequestResult(ok=False, retryable=True, error=e)
-
-    except AuthenticationError as e:
-        ep.disable("auth error")
-        logging.error(
-            f"AuthenticationError from {ep.cfg.name}; disabling endpoint. Error: {e}"
-        )
-        return RequestResult(ok=False, retryable=False, error=e)
+    except _HANDLED_ERRORS as e:
+        return _failure(ep, e, started)
+
+    return _success(ep, resp, usage, started)
+
+
+def invoke_endpoint_choices(
+    ep: AzureEndpointState,
+    messages: list[dict] | list[ChatCompletionMessageParam],
+    n: int,
+    *,
+    _validated: bool = False,
+) -> RequestResult:
+    """
+    Request `n` completions of the same messages in a single call.
+
+    On success, `choices` holds the `n` contents in order and `response`
+    the first of them.
+    """
+    if not _validated and not is_chat_message_list(messages):
+        raise ValueError("messages must be a list of ChatCompletionMessageParam")
+    started = time.perf_counter()
+    try:
+        choices, usage = _completion_choices(ep, messages, n)
+    except _HANDLED_ERRORS as e:
+        return _failure(ep, e, started)
+
+    result = _success(ep, choices[0] if choices else "", usage, started)
+    result.choices = choices
+    return result
+
 
-    except APITimeoutError as e:
-        ep.note_transient_error(e, base_cooldown=1.0)
-        logging.warning(
-            f"APITimeoutError from {ep.cfg.name}; applying transient error cooldown. Error: {e}"
+async def ainvoke_endpoint(
+    ep: AzureEndpointState,
+    messages: list[dict] | list[ChatCompletionMessageParam],
+    *,
+    _validated: bool = False,
+    **kwargs,
+) -> RequestResult:
+    """
+    Async counterpart of `invoke_endpoint`, using `ep.async_client`.
+
+    Many calls can be in flight on one event loop at once; error handling,
+    cooldowns and endpoint health tracking are shared with the sync path.
+    """
+    if ep.async_client is None:
+        raise RuntimeError(
+            f"Endpoint {ep.cfg.name} has no async client; "
+            "build endpoints with build_endpoint_states() to enable async calls."
+        )
+    if not _validated and not is_chat_message_list(messages):
+        raise ValueError("messages must be a list of ChatCompletionMessageParam")
+    started = time.perf_counter()
+    try:
+        resp, usage = await (
+            _astream_completion(ep, messages)
+            if kwargs.get("stream")
+            else _acompletion(ep, messages)
         )
-        return RequestResult(ok=False, retryable=True, error=e)
+    except _HANDLED_ERRORS as e:
+        return _failure(ep, e, started)
+
+    return _success(ep, resp, usage, started)
+
+
+def _success(
+    ep: AzureEndpointState,
+    response: str,
+    usage: Optional[dict[str, Any]],
+    started: float,
+) -> RequestResult:
+    """Record a successful call on `ep` and build its result."""
+    latency_s = time.perf_counter() - started
+    ep.note_success()
+    result = RequestResult(
+        ok=True, retryable=False, response=response, latency_s=latency_s
+    )
+    if usage:
+        result.prompt_tokens = usage.get("prompt_tokens")
+        result.completion_tokens = usage.get("completion_tokens")
+    return result
+
+
+def _failure(ep: AzureEndpointState, e: Exception, started: float) -> RequestResult:
+    """Classify a failed call on `ep` and stamp its latency on the result."""
+    latency_s = time.perf_counter() - started
+    result = _handle_error(ep, e)
+    result.latency_s = latency_s
+    return result
 
-    except BadRequestError as e:
-        logging.error(
-            f"BadRequestError sent to {ep.cfg.name}; not retrying. Error: {e}"
+
+def _handle_rate_limit(ep: AzureEndpointState, e: RateLimitError) -> RequestResult:
+    retry_after = parse_retry_after_seconds(e)
+
+    # Lazy %-style arguments: nothing is formatted unless the record is
+    # emitted, which matters when many requests are being throttled.
+    if not retry_after:
+        logger.warning(
+            "RateLimitError from %s "
+            "without Retry-After header nor parseable message. "
+            "Defaulting to 15s cooldown. Error: %s",
+            ep.cfg.name,
+            e,
+        )
+        retry_after = 15.0
+    else:
+        logger.info(
+            "RateLimitError from %s; setting cooldown for %s seconds.",
+            ep.cfg.name,
+            retry_after,
         )
 
-        # per-request bug, not endpoint bug
-        return RequestResult(ok=False, retryable=False, error=e)
+    cooldown_until = time.monotonic() + retry_after
+    ep.set_cooldown(cooldown_until, exc=e)
+    return RequestResult(ok=False, retryable=True, error=e)
+
+
+def _handle_auth(ep: AzureEndpointState, e: AuthenticationError) -> RequestResult:
+    ep.disable("auth error")
+    logger.error(
+        "AuthenticationError from %s; disabling endpoint. Error: %s",
+        ep.cfg.name,
+        e,
+    )
+    return RequestResult(ok=False, retryable=False, error=e)
+
+
+def _handle_timeout(ep: AzureEndpointState, e: APITimeoutError) -> RequestResult:
+    ep.note_transient_error(e, base_cooldown=1.0)
+    logger.warning(
+        "APITimeoutError from %s; applying transient error cooldown. Error: %s",
+        ep.cfg.name,
+        e,
+    )
+    return RequestResult(ok=False, retryable=True, error=e)
+
+
+def _handle_bad_request(ep: AzureEndpointState, e: BadRequestError) -> RequestResult:
+    logger.error("BadRequestError sent to %s; not retrying. Error: %s", ep.cfg.name, e)
+
+    # per-request bug, not endpoint bug
+    return RequestResult(ok=False, retryable=False, error=e)
+
+
+_HANDLERS: dict[type, Callable[[AzureEndpointState, Any], RequestResult]] = {
+    RateLimitError: _handle_rate_limit,
+    AuthenticationError: _handle_auth,
+    APITimeoutError: _handle_timeout,
+    BadRequestError: _handle_bad_request,
+}
+"""Error handlers keyed by exception class; keys match `_HANDLED_ERRORS`."""
+
+
+def _handle_error(ep: AzureEndpointState, e: Exception) -> RequestResult:
+    """Update endpoint health for `e` and classify it as retryable or not."""
+    # The SDK raises these classes directly, so the exact-type lookup almost
+    # always hits; subclasses resolve to their nearest handled base class.
+    handler = _HANDLERS.get(type(e))
+    if handler is None:
+        handler = next(_HANDLERS[cls] for cls in type(e).__mro__ if cls in _HANDLERS)
+    return handler(ep, e)
+
+
+def _choice_contents(body: bytes) -> tuple[list[str], Optional[dict[str, Any]]]:
+    """
+    Extract the message contents, in choice order, and the token usage (if
+    reported) from a raw chat completion response body.
+
+    The non-streaming paths read the body through `with_raw_response`: the
+    SDK still builds the request, handles auth and raises its typed errors,
+    but we skip validating the whole response into a `ChatCompletion` model
+    just to read the content strings back out of it.
+    """
+    resp = _json_loads(body)
+    choices = resp["choices"]
+    if len(choices) > 1:
+        choices.sort(key=lambda c: c["index"])
+    return [c["message"].get("content") or "" for c in choices], resp.get("usage")
 
 
 def _completion(
     ep: AzureEndpointState, messages: Iterable[ChatCompletionMessageParam]
-) -> str:
-    resp = ep.client.chat.completions.create(
-        model=ep.cfg.model,
-        messages=messages,
-        temperature=ep.cfg.temperature,
-        max_completion_tokens=ep.cfg.max_completion_tokens,
-        stream=False,
+) -> tuple[str, Optional[dict[str, Any]]]:
+    raw = ep.client.chat.completions.with_raw_response.create(
+        messages=messages, stream=False, **ep.completion_kwargs
     )
-    # If token usage present, we could keep stats here; not needed for gating
-    return resp.choices[0].message.content or ""
+    contents, usage = _choice_contents(raw.http_response.content)
+    return contents[0], usage
+
+
+def _completion_choices(
+    ep: AzureEndpointState, messages: Iterable[ChatCompletionMessageParam], n: int
+) -> tuple[list[str], Optional[dict[str, Any]]]:
+    raw = ep.client.chat.completions.with_raw_response.create(
+        messages=messages, n=n, stream=False, **ep.completion_kwargs
+    )
+    return _choice_contents(raw.http_response.content)
+
+
+def _decode_stream_event(data: str, response: Any) -> dict[str, Any]:
+    """
+    Decode one chat completion stream event from the payload of its `data:`
+    line, raising `APIError` for error events as the SDK's stream does.
+
+    Streams are read through `with_streaming_response` and decoded here
+    instead of iterating the SDK's `Stream`, which builds a
+    `ChatCompletionChunk` model for every token.
+    """
+    chunk = _json_loads(data)
+    error = chunk.get("error")
+    if error:
+        message = error.get("message") if isinstance(error, dict) else None
+        raise APIError(
+            message=message or "An error occurred during streaming",
+            request=response.http_request,
+            body=error,
+        )
+    return chunk
 
 
 def _stream_completion(
     ep: AzureEndpointState, messages: Iterable[ChatCompletionMessageParam]
-) -> str:
-    chunks = ep.client.chat.completions.create(
-        model=ep.cfg.model,
+) -> tuple[str, Optional[dict[str, Any]]]:
+    # list + join is deliberate: measured faster than io.StringIO writes, with
+    # the same peak memory (the list only holds references to chunk strings).
+    parts: list[str] = []
+    append = parts.append
+    usage = None
+    with ep.client.chat.completions.with_streaming_response.create(
         messages=messages,
-        temperature=ep.cfg.temperature,
-        max_completion_tokens=ep.cfg.max_completion_tokens,
         stream=True,
+        **ep.stream_kwargs,
+    ) as response:
+        for line in response.iter_lines():
+            # The service sends each event as a single `data:` line; blank
+            # separators and other SSE fields carry nothing we need.
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].lstrip()
+            if data.startswith("[DONE]"):
+                break
+            chunk = _decode_stream_event(data, response)
+            choices = chunk.get("choices")
+            if choices:
+                delta = choices[0].get("delta")
+                if delta and delta.get("content"):
+                    append(delta["content"])
+            elif chunk.get("usage"):
+                # Final usage-only chunk; see AzureEndpointState.stream_kwargs.
+                usage = chunk["usage"]
+    return "".join(parts), usage
+
+
+async def _acompletion(
+    ep: AzureEndpointState, messages: Iterable[ChatCompletionMessageParam]
+) -> tuple[str, Optional[dict[str, Any]]]:
+    raw = await ep.async_client.chat.completions.with_raw_response.create(
+        messages=messages, stream=False, **ep.completion_kwargs
     )
+    contents, usage = _choice_contents(raw.http_response.content)
+    return contents[0], usage
 
-    parts = []
-    # Some SDKs emit a final "usage" block; we don't depend on it here.
-    for chunk in chunks:
-        if not chunk.choices:
-            continue
-        delta = chunk.choices[0].delta
-        if delta and getattr(delta, "content", None):
-            parts.append(delta.content)
-    return "".join(parts)
+
+async def _astream_completion(
+    ep: AzureEndpointState, messages: Iterable[ChatCompletionMessageParam]
+) -> tuple[str, Optional[dict[str, Any]]]:
+    parts: list[str] = []
+    append = parts.append
+    usage = None
+    async with ep.async_client.chat.completions.with_streaming_response.create(
+        messages=messages,
+        stream=True,
+        **ep.stream_kwargs,
+    ) as response:
+        async for line in response.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].lstrip()
+            if data.startswith("[DONE]"):
+                break
+            chunk = _decode_stream_event(data, response)
+            choices = chunk.get("choices")
+            if choices:
+                delta = choices[0].get("delta")
+                if delta and delta.get("content"):
+                    append(delta["content"])
+            elif chunk.get("usage"):
+                # Final usage-only chunk; see AzureEndpointState.stream_kwargs.
+                usage = chunk["usage"]
+    return "".join(parts), usage
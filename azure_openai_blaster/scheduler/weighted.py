@@ -1,54 +1,187 @@
+import asyncio
+import itertools
+import logging
 import random
 import threading
 import time
+from math import gcd
+from typing import Optional
 
 from azure_openai_blaster.azure_endpoint_state import AzureEndpointState
 
+logger = logging.getLogger(__name__)
+
+_RANDOM_PROBES = 4
+"""Random ring probes tried before collecting every ready slot in `_pick`."""
+
+_NO_ENDPOINTS_MSG = (
+    "WeightedRRScheduler failed to schedule next() "
+    "as there were no available endpoints. "
+    "Were they all disabled due to consecutive failures?"
+)
+
 
 class WeightedRRScheduler:
+    """
+    Interleaved weighted round-robin (IWRR) over a set of endpoints.
+
+    Each round, an endpoint is picked `weight // gcd(weights)` times, and
+    picks are interleaved across endpoints rather than issued in bursts.
+    The interleaved sequence is computed once; callers take a ticket from an
+    atomic counter and use that slot, so `next()` takes no lock. If the slot's
+    endpoint is unavailable, a ready slot is chosen uniformly at random.
+    Disabled endpoints are filtered out of the sequence when they are disabled,
+    so picks never scan past them.
+    """
+
     def __init__(self, endpoints: list[AzureEndpointState]):
         self.endpoints = endpoints
         """List of all endpoints being scheduled."""
 
-        ring = []
-        for ep in endpoints:
-            ring.extend([ep] * max(1, ep.cfg.weight))
-        random.shuffle(ring)
+        # Normalize once here so the round length is sum(weights) / gcd;
+        # configs keep the weights exactly as the user wrote them.
+        weights = [max(1, ep.cfg.weight) for ep in endpoints]
+        g = gcd(*weights) if weights else 1
+        if g > 1:
+            logger.info(
+                "WeightedRRScheduler: reduced endpoint weights by gcd %d (%s -> %s)",
+                g,
+                weights,
+                [w // g for w in weights],
+            )
 
-        self._ring: list[AzureEndpointState] = ring
-        """Weighted round-robin ring of endpoints."""
-        self._idx: int = 0
-        """Current index in the round-robin ring."""
-        self._lock = threading.Lock()
+        quotas = [w // g for w in weights]
+
+        # Sub-round r contains, in config order, every endpoint whose quota
+        # exceeds r, so heavy endpoints are spread across the cycle instead of
+        # bunched together. The sequence is deterministic for a given config.
+        ring: list[AzureEndpointState] = []
+        for r in range(max(quotas, default=0)):
+            ring.extend(ep for ep, q in zip(endpoints, quotas) if q > r)
+
+        self._ring: tuple[AzureEndpointState, ...] = tuple(ring)
+        """Precomputed IWRR cycle; never mutated after construction."""
+        self._active_ring: tuple[AzureEndpointState, ...] = tuple(
+            ep for ep in ring if not ep.disabled
+        )
+        """`_ring` without disabled endpoints. Replaced wholesale (never mutated)
+        when an endpoint is disabled, so readers keep a consistent snapshot."""
+        self._active_endpoints: tuple[AzureEndpointState, ...] = tuple(
+            ep for ep in endpoints if not ep.disabled
+        )
+        """Distinct endpoints of `_active_ring`, republished alongside it."""
+        self._counter = itertools.count(random.randrange(len(ring) or 1))
+        """Ticket source for ring positions; `next()` on it is GIL-atomic.
+        Starts at a random phase so processes sharing a config don't all
+        hit the same endpoint first."""
+
+        self._cv = threading.Condition()
+        """Wakes threads in `next()` waiting out a cooldown."""
+        self._generation = 0
+        """Bumped under `_cv` on every endpoint state change, so a waiter can
+        tell whether it missed a notification between `_pick()` and `wait()`."""
+        for ep in endpoints:
+            ep.add_listener(self._endpoint_changed)
 
     def next(self) -> AzureEndpointState:
-        """Pick the next available endpoint; if all cooling down, wait minimally."""
+        """
+        Pick the next available endpoint; if all are cooling down, wait until
+        the soonest cooldown expires or an endpoint changes state.
+        """
         while True:
-            with self._lock:
-                n = len(self._ring)
-                now = time.monotonic()
-
-                available_found = False
-                soonest = None
-                for _ in range(n):
-                    ep = self._ring[self._idx]
-                    self._idx = (self._idx + 1) % n
-                    if ep.disabled:
-                        continue
-                    if ep.available(now=now):
-                        return ep
-
-                    available_found = True
-                    if soonest is None or ep.cooldown_until < soonest:
-                        soonest = ep.cooldown_until
-
-                if not available_found or soonest is None:
-                    raise RuntimeError(
-                        "WeightedRRScheduler failed to schedule next() "
-                        "as there were no available endpoints. "
-                        "Were they all disabled due to consecutive failures?"
-                    )
-                delay = max(0.0, soonest - now)
-
+            generation = self._generation
+            ep, delay = self._pick()
+            if ep is not None:
+                return ep
             if delay > 0:
-                time.sleep(delay)
+                with self._cv:
+                    if generation == self._generation:
+                        self._cv.wait(timeout=delay)
+
+    def _endpoint_changed(self) -> None:
+        """
+        Listener registered on every endpoint: republishes the active ring and
+        wakes waiting `next()` calls.
+        """
+        with self._cv:
+            self._active_endpoints = tuple(
+                ep for ep in self.endpoints if not ep.disabled
+            )
+            self._active_ring = tuple(ep for ep in self._ring if not ep.disabled)
+            self._generation += 1
+            self._cv.notify_all()
+
+    async def anext(self) -> AzureEndpointState:
+        """
+        Async counterpart of `next()`: waits for a cooldown with `asyncio.sleep`
+        so the event loop keeps running.
+        """
+        while True:
+            ep, delay = self._pick()
+            if ep is not None:
+                return ep
+            await asyncio.sleep(delay)
+
+    def try_next(self) -> Optional[AzureEndpointState]:
+        """Pick the next available endpoint, or None if all are cooling down."""
+        ep, _ = self._pick()
+        return ep
+
+    def _pick(self) -> tuple[Optional[AzureEndpointState], float]:
+        """
+        Return `(endpoint, 0.0)`, or `(None, delay)` with the time until the
+        soonest cooldown expires.
+
+        Lock-free: the active ring is an immutable snapshot and each call
+        claims its own ring position, so concurrent callers never start on the
+        same slot. Endpoint fields are read once per probe into locals, so each
+        decision uses a consistent view even while other threads update them.
+        """
+        ring = self._active_ring
+        n = len(ring)
+        if not n:
+            raise RuntimeError(_NO_ENDPOINTS_MSG)
+
+        # One clock read per pass, shared by every availability probe below.
+        now = time.monotonic()
+        ep = ring[next(self._counter) % n]
+        if not ep.disabled and now >= ep.cooldown_until:
+            return ep, 0.0
+
+        # The ticket's slot is unavailable. Probe each distinct endpoint once
+        # before scanning the ring: when all of them are cooling down (e.g.
+        # every waiter polling through a rate-limit storm) this answers in
+        # len(endpoints) probes rather than sum(weights).
+        soonest = None
+        for ep in self._active_endpoints:
+            # An endpoint disabled since this snapshot was published is
+            # still skipped; the listener drops it from the next snapshot.
+            if ep.disabled:
+                continue
+            cooldown_until = ep.cooldown_until
+            if now >= cooldown_until:
+                break
+            if soonest is None or cooldown_until < soonest:
+                soonest = cooldown_until
+        else:
+            if soonest is None:
+                raise RuntimeError(_NO_ENDPOINTS_MSG)
+            return None, max(0.0, soonest - now)
+
+        # Some endpoint is ready. Pick uniformly among the ready slots, so the
+        # unavailable slot's share is split across the ready endpoints in
+        # proportion to their weights. A forward scan would instead hand it
+        # all to whichever endpoint follows a run of unavailable slots.
+        # Random probes accept each ready slot with equal probability; if
+        # they all miss (few slots ready), choose among the collected ones.
+        for _ in range(_RANDOM_PROBES):
+            ep = ring[random.randrange(n)]
+            if not ep.disabled and now >= ep.cooldown_until:
+                return ep, 0.0
+        ready = [ep for ep in ring if not ep.disabled and now >= ep.cooldown_until]
+        if ready:
+            return random.choice(ready), 0.0
+
+        # The ready endpoint was cooled or disabled by another thread in the
+        # meantime; let the caller pick again straight away.
+        return None, 0.0
@@ -0,0 +1,118 @@
+"""
+Fakes shared by the tests.
+
+Endpoints get real SDK clients whose HTTP transport is faked, so requests go
+through the same code paths as against Azure without touching the network.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Optional
+
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI
+
+from azure_openai_blaster import AzureDeploymentConfig, AzureEndpointState
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def completion(*contents: str, usage: Optional[dict] = None) -> httpx.Response:
+    """A chat completion response with one choice per entry in `contents`."""
+    body: dict[str, Any] = {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-test",
+        "choices": [
+            {
+                "index": i,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+            for i, content in enumerate(contents)
+        ],
+    }
+    if usage is not None:
+        body["usage"] = usage
+    return httpx.Response(200, json=body)
+
+
+def error(status: int, message: str = "error") -> httpx.Response:
+    """An API error response, shaped like the service's."""
+    return httpx.Response(
+        status, json={"error": {"message": message, "type": "invalid_request"}}
+    )
+
+
+def sse(*events: dict, done: bool = True) -> httpx.Response:
+    """A streamed response sending each of `events` as one `data:` line."""
+    lines = [f"data: {json.dumps(event)}\n\n" for event in events]
+    if done:
+        lines.append("data: [DONE]\n\n")
+    return httpx.Response(
+        200,
+        headers={"content-type": "text/event-stream"},
+        content="".join(lines).encode(),
+    )
+
+
+def delta(content: str) -> dict:
+    """A stream chunk carrying `content`."""
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-test",
+        "choices": [{"index": 0, "delta": {"content": content}}],
+    }
+
+
+class FakeAzure:
+    """
+    Fake Azure OpenAI service: answers every request with `handler` and
+    records the JSON body of each request it received.
+    """
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests.append(json.loads(request.content))
+        return self.handler(request)
+
+    def transport(self) -> httpx.MockTransport:
+        """An HTTP transport, for sync or async clients, that calls this fake."""
+        return httpx.MockTransport(self._handle)
+
+    def endpoint(
+        self, name: str = "ep", weight: int = 1, **cfg: Any
+    ) -> AzureEndpointState:
+        """An endpoint state whose sync and async clients call this fake."""
+        config = AzureDeploymentConfig(
+            name=name,
+            endpoint=f"https://{name}.openai.azure.com",
+            api_key="test-key",
+            model="gpt-test",
+            weight=weight,
+            **cfg,
+        )
+        transport = self.transport()
+        client_kwargs: dict[str, Any] = {
+            "api_key": config.api_key,
+            "azure_endpoint": config.endpoint,
+            "api_version": config.api_version,
+            "max_retries": 0,
+        }
+        return AzureEndpointState(
+            cfg=config,
+            client=AzureOpenAI(
+                http_client=httpx.Client(transport=transport), **client_kwargs
+            ),
+            async_client=AsyncAzureOpenAI(
+                http_client=httpx.AsyncClient(transport=transport), **client_kwargs
+            ),
+        )
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fakes import FakeAzure, completion, error
+from openai import BadRequestError
+
+from azure_openai_blaster import AzureLLMBlaster
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _gated(handler):
+    """
+    Wrap `handler` so the first request blocks until the returned event is
+    set, holding the only worker while the test queues more jobs.
+    """
+    gate = threading.Event()
+    first = threading.Event()
+
+    def gated(request):
+        if not first.is_set():
+            first.set()
+            gate.wait(timeout=10)
+        return handler(request)
+
+    return gated, first, gate
+
+
+def _submit_batch(blaster, gate_started, gate, count):
+    """Hold the worker on one job, queue `count` identical jobs, then release."""
+    blocker = blaster.submit_chat_completion([{"role": "user", "content": "gate"}])
+    assert gate_started.wait(timeout=10)
+    futures = [blaster.submit_chat_completion(MESSAGES) for _ in range(count)]
+    gate.set()
+    blocker.result(timeout=10)
+    return futures
+
+
+def test_chat_completion_returns_content():
+    fake = FakeAzure(lambda request: completion("hello"))
+    blaster = AzureLLMBlaster([fake.endpoint()], num_workers=2)
+    try:
+        assert blaster.chat_completion(MESSAGES) == "hello"
+    finally:
+        blaster.close()
+    assert fake.requests[0]["messages"] == MESSAGES
+
+
+def test_coalescing_is_off_by_default():
+    def handler(request):
+        return completion("single")
+
+    gated, started, gate = _gated(handler)
+    fake = FakeAzure(gated)
+    blaster = AzureLLMBlaster([fake.endpoint()], num_workers=1)
+    try:
+        futures = _submit_batch(blaster, started, gate, 3)
+        assert [f.result(timeout=10) for f in futures] == ["single"] * 3
+    finally:
+        blaster.close()
+    assert all("n" not in body for body in fake.requests)
+
+
+def test_coalesced_jobs_share_one_n_request():
+    def handler(request):
+        return completion("c0", "c1", "c2")
+
+    gated, started, gate = _gated(handler)
+    fake = FakeAzure(gated)
+    blaster = AzureLLMBlaster([fake.endpoint()], num_workers=1, coalesce_requests=True)
+    try:
+        futures = _submit_batch(blaster, started, gate, 3)
+        assert [f.result(timeout=10) for f in futures] == ["c0", "c1", "c2"]
+    finally:
+        blaster.close()
+    # The gate request, then a single request for all three jobs.
+    assert [body.get("n") for body in fake.requests] == [None, 3]
+
+
+def test_coalesced_request_rejected_with_400_runs_jobs_alone():
+    def handler(request):
+        if "n" in json.loads(request.content):
+            return error(400, "n is not supported")
+        return completion("single")
+
+    gated, started, gate = _gated(handler)
+    fake = FakeAzure(gated)
+    blaster = AzureLLMBlaster([fake.endpoint()], num_workers=1, coalesce_requests=True)
+    try:
+        futures = _submit_batch(blaster, started, gate, 3)
+        assert [f.result(timeout=10) for f in futures] == ["single"] * 3
+    finally:
+        blaster.close()
+    assert [body.get("n") for body in fake.requests] == [None, 3, None, None, None]
+
+
+def test_bad_request_surfaces_on_the_future():
+    fake = FakeAzure(lambda request: error(400, "bad prompt"))
+    blaster = AzureLLMBlaster([fake.endpoint()], num_workers=1)
+    try:
+        with pytest.raises(BadRequestError):
+            blaster.chat_completion(MESSAGES)
+    finally:
+        blaster.close()
+
+
+def test_achat_completion_runs_concurrently():
+    fake = FakeAzure(lambda request: completion("async"))
+
+    async def main():
+        blaster = AzureLLMBlaster([fake.endpoint()], num_workers=1)
+        try:
+            return await asyncio.gather(
+                *(blaster.achat_completion(MESSAGES) for _ in range(5))
+            )
+        finally:
+            await blaster.aclose()
+
+    assert asyncio.run(main()) == ["async"] * 5
+    assert len(fake.requests) == 5
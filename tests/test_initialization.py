@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+from fakes import FakeAzure, completion
+
+from azure_openai_blaster import (
+    AzureLLMBlaster,
+    build_endpoint_states,
+    initialization,
+    release_endpoint_states,
+)
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+CONFIG = {
+    "deployments": [
+        {
+            "name": "mini",
+            "endpoint": "https://pool.openai.azure.com",
+            "api_key": "test-key",
+            "model": "gpt-mini",
+        },
+        {
+            "name": "large",
+            "endpoint": "https://pool.openai.azure.com",
+            "api_key": "test-key",
+            "model": "gpt-large",
+        },
+    ]
+}
+
+
+@pytest.fixture
+def fake(monkeypatch: pytest.MonkeyPatch) -> FakeAzure:
+    """Route the pooled HTTP clients to a fake service."""
+    fake = FakeAzure(lambda request: completion("pooled"))
+    transport = fake.transport()
+    monkeypatch.setattr(
+        initialization,
+        "DefaultHttpxClient",
+        lambda **kwargs: httpx.Client(transport=transport),
+    )
+    monkeypatch.setattr(
+        initialization,
+        "DefaultAsyncHttpxClient",
+        lambda **kwargs: httpx.AsyncClient(transport=transport),
+    )
+    return fake
+
+
+def test_builds_share_pooled_clients_until_last_release(fake):
+    first = build_endpoint_states(CONFIG)
+    second = build_endpoint_states(CONFIG)
+
+    # Same connection identity, so one client serves every deployment and build.
+    client = first[0].client
+    assert all(ep.client is client for ep in first + second)
+
+    release_endpoint_states(first)
+    assert not client.is_closed()
+    release_endpoint_states(second)
+    assert client.is_closed()
+
+
+def test_closing_one_blaster_keeps_the_other_working(fake):
+    b1 = AzureLLMBlaster.from_config(CONFIG, num_workers=1)
+    b2 = AzureLLMBlaster.from_config(CONFIG, num_workers=1)
+    client = b2._endpoints[0].client
+
+    b1.close()
+    assert not client.is_closed()
+    assert b2.chat_completion(MESSAGES) == "pooled"
+
+    b2.close()
+    assert client.is_closed()
+
+
+def test_close_leaves_caller_owned_states_open(fake):
+    states = build_endpoint_states(CONFIG)
+    b1 = AzureLLMBlaster(states, num_workers=1)
+    b2 = AzureLLMBlaster(states, num_workers=1)
+
+    b1.close()
+    assert b2.chat_completion(MESSAGES) == "pooled"
+    b2.close()
+    assert not states[0].client.is_closed()
+
+    release_endpoint_states(states)
+    assert states[0].client.is_closed()
+
+
+def test_aclose_closes_async_clients(fake):
+    async def main():
+        blaster = AzureLLMBlaster.from_config(CONFIG, num_workers=1)
+        texts = await asyncio.gather(
+            *(blaster.achat_completion(MESSAGES) for _ in range(4))
+        )
+        await blaster.aclose()
+        return texts, blaster._endpoints
+
+    texts, endpoints = asyncio.run(main())
+    assert texts == ["pooled"] * 4
+    assert all(ep.async_client.is_closed() for ep in endpoints)
+    assert all(ep.client.is_closed() for ep in endpoints)
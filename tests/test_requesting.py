@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fakes import FakeAzure, completion, delta, sse
+from openai import APIError
+
+from azure_openai_blaster.requesting import ainvoke_endpoint, invoke_endpoint
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_stream_joins_deltas():
+    fake = FakeAzure(
+        lambda request: sse(
+            {"choices": [{"index": 0, "delta": {"role": "assistant"}}]},
+            delta("Hel"),
+            delta("lo"),
+        )
+    )
+
+    result = invoke_endpoint(fake.endpoint(), MESSAGES, stream=True)
+
+    assert result.ok
+    assert result.response == "Hello"
+    assert fake.requests[0]["stream"] is True
+
+
+def test_async_stream_joins_deltas():
+    fake = FakeAzure(lambda request: sse(delta("as"), delta("ync")))
+
+    result = asyncio.run(ainvoke_endpoint(fake.endpoint(), MESSAGES, stream=True))
+
+    assert result.ok
+    assert result.response == "async"
+
+
+def test_stream_error_event_raises():
+    fake = FakeAzure(
+        lambda request: sse(delta("partial"), {"error": {"message": "boom"}})
+    )
+
+    with pytest.raises(APIError, match="boom"):
+        invoke_endpoint(fake.endpoint(), MESSAGES, stream=True)
+
+
+def test_completion_reports_usage():
+    usage = {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}
+    fake = FakeAzure(lambda request: completion("hi", usage=usage))
+
+    result = invoke_endpoint(fake.endpoint(), MESSAGES)
+
+    assert (result.prompt_tokens, result.completion_tokens) == (5, 2)
+    assert result.latency_s is not None and result.latency_s >= 0
+
+
+def test_stream_reads_usage_chunk():
+    usage = {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}
+    fake = FakeAzure(lambda request: sse(delta("hi"), {"choices": [], "usage": usage}))
+
+    result = invoke_endpoint(fake.endpoint(), MESSAGES, stream=True)
+
+    assert result.response == "hi"
+    assert (result.prompt_tokens, result.completion_tokens) == (3, 1)
+    assert fake.requests[0]["stream_options"] == {"include_usage": True}
+
+
+def test_stream_usage_not_requested_on_older_api_versions():
+    fake = FakeAzure(lambda request: sse(delta("hi")))
+    ep = fake.endpoint(api_version="2024-06-01")
+
+    result = invoke_endpoint(ep, MESSAGES, stream=True)
+
+    assert result.response == "hi"
+    assert "stream_options" not in fake.requests[0]
+    assert result.prompt_tokens is None and result.completion_tokens is None
@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from collections import Counter
+
+import pytest
+from fakes import FakeAzure, completion
+
+from azure_openai_blaster import WeightedRRScheduler
+
+
+def _endpoints(**weights: int):
+    fake = FakeAzure(lambda request: completion("ok"))
+    return [fake.endpoint(name, weight=w) for name, w in weights.items()]
+
+
+def test_picks_follow_weights_interleaved():
+    eps = _endpoints(a=6, b=2, c=4)
+    scheduler = WeightedRRScheduler(eps)
+
+    # Weights reduce by their gcd to 3:1:2, so every cycle of 6 picks holds
+    # each endpoint exactly `weight` times, whatever the starting phase.
+    picks = [scheduler.next().cfg.name for _ in range(60)]
+    for start in range(0, 60, 6):
+        assert Counter(picks[start : start + 6]) == {"a": 3, "b": 1, "c": 2}
+    # Interleaved rather than in bursts: no endpoint is picked 3 times in a row.
+    assert all(len(set(picks[i : i + 3])) > 1 for i in range(58))
+
+
+def test_fallback_spreads_unavailable_share_uniformly():
+    random.seed(0)
+    eps = _endpoints(a=1, b=1, c=1)
+    eps[0].cooldown_until = time.monotonic() + 60
+    scheduler = WeightedRRScheduler(eps)
+
+    picks = Counter(scheduler.next().cfg.name for _ in range(3000))
+
+    # a's slots are handed out at random, not all to its neighbour in the ring.
+    assert picks["a"] == 0
+    assert 1300 < picks["b"] < 1700
+    assert 1300 < picks["c"] < 1700
+
+
+def test_try_next_returns_none_while_every_endpoint_cools():
+    eps = _endpoints(a=1, b=2)
+    for ep in eps:
+        ep.cooldown_until = time.monotonic() + 60
+    scheduler = WeightedRRScheduler(eps)
+
+    assert scheduler.try_next() is None
+
+
+def test_raises_once_every_endpoint_is_disabled():
+    eps = _endpoints(a=1, b=1)
+    scheduler = WeightedRRScheduler(eps)
+    for ep in eps:
+        ep.disable("test")
+
+    with pytest.raises(RuntimeError, match="no available endpoints"):
+        scheduler.next()
+
+
+def test_disable_wakes_threads_waiting_on_a_cooldown():
+    eps = _endpoints(a=1)
+    eps[0].cooldown_until = time.monotonic() + 60
+    scheduler = WeightedRRScheduler(eps)
+    raised = []
+
+    def wait_for_endpoint():
+        try:
+            scheduler.next()
+        except RuntimeError as e:
+            raised.append(e)
+
+    waiter = threading.Thread(target=wait_for_endpoint)
+    waiter.start()
+    time.sleep(0.1)
+    eps[0].disable("test")
+    waiter.join(timeout=5)
+
+    # Woken by the disable rather than sleeping out the 60s cooldown.
+    assert not waiter.is_alive()
+    assert len(raised) == 1